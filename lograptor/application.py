@@ -21,18 +21,156 @@ Module to manage lograptor applications
 #
 import logging
 import re
+import heapq
 import string
 import configparser
-from collections import Counter
+from collections import defaultdict
+from functools import partial
+from operator import itemgetter, methodcaller
 
 from .exceptions import LogRaptorConfigError, RuleMissingError, LogRaptorOptionError
 from .confparsers import AppConfig
 from .report import ReportData
-from .utils import field_multisub, exact_sub
+from .utils import field_multisub, exact_sub, get_pattern_literals, \
+    tuple_itemgetter, is_combinable, is_embeddable, unname_groups
 
 
 logger = logging.getLogger(__package__)
 
+CONDITION_PATTERN = re.compile(r'(\w+)(!=|==)\"([^\"]*)\"')
+COMMA_SEPARATOR_PATTERN = re.compile(r'\s*,\s*')
+
+
+def combine_rules(rules):
+    """
+    Combine the patterns of a list of rules into a single alternation pattern.
+    The inner named groups are turned into unnamed groups, so the matched values
+    of a rule can be read from the combined match by an offset of group indexes.
+    Each alternative ends with an empty named group, that is the last group matched
+    and identifies the rule. Leading literals are left in front, to not hide them to
+    regex optimizer.
+    The standard `re` engine is used also for combined patterns, because the rule
+    patterns rely on its Unicode semantics of character classes, that differ from
+    the ones of RE2, and because the rule identification relies on `lastindex`.
+
+    :param rules: a list of AppRule instances.
+    :return: a couple with the combined pattern and a map from group index to \
+    rule index, or `None` if the rule patterns cannot be combined.
+    """
+    if not rules:
+        return
+
+    parts = []
+    for k, rule in enumerate(rules):
+        if rule.pattern.flags != re.UNICODE or not is_combinable(rule.pattern.pattern):
+            return
+        parts.append('(?:%s)(?P<_r%d>)' % (unname_groups(rule.pattern.pattern), k))
+
+    try:
+        pattern = re.compile('|'.join(parts))
+    except re.error:
+        return
+    else:
+        return pattern, {pattern.groupindex['_r%d' % k]: k for k in range(len(rules))}
+
+
+def group_getter(indexes):
+    """
+    Returns a callable that gets the groups of a match object with the provided
+    indexes. The callable always returns a tuple, also if the indexes are one or none.
+    """
+    if len(indexes) > 1:
+        return methodcaller('group', *indexes)
+    elif indexes:
+        index = indexes[0]
+        return lambda match: (match.group(index),)
+    else:
+        return lambda match: ()
+
+
+class AppRuleGroup(object):
+    """
+    A group of application rules that share the same leading literal. If all the
+    rules require literal strings, that is the common case of log messages, the
+    group works as a multi-pattern scanner: fast substring tests on all the required
+    literals select the rules that are searched in order. Otherwise the rules are
+    searched together with a combined pattern, so the regex engine can quickly skip
+    to the candidate positions of the message.
+
+    :param rules: the list of rules of the group.
+    :param indexes: the positions of the rules in the app's rules list.
+    """
+    def __init__(self, rules, indexes):
+        self.rules = rules
+        self.indexes = indexes
+        self._searches = [rule.pattern.search for rule in rules]
+        self._matches = [rule.pattern.match for rule in rules]
+        self._literals = []
+        for rule in rules:
+            # Short secondary literals are almost always found, so they are not checked
+            literals = rule.literals
+            self._literals.append(tuple(literals[:1] + [x for x in literals[1:] if len(x) > 3]))
+        if len(rules) > 1 and not all(self._literals):
+            self.pattern, self.rules_index = combine_rules(rules) or (None, None)
+        else:
+            self.pattern = self.rules_index = None
+
+        if self.pattern is not None:
+            # Getters of rule values from the groups of the combined pattern
+            self._gids = [tuple(rule.pattern.groupindex) for rule in rules]
+            self._value_getters = [None] * len(rules)
+            for group_index, k in self.rules_index.items():
+                offset = group_index - rules[k].pattern.groups - 1
+                self._value_getters[k] = group_getter(
+                    [offset + gid for gid in rules[k].pattern.groupindex.values()]
+                )
+
+    def __repr__(self):
+        return "%s(rules=%r)" % (self.__class__.__name__, self.rules)
+
+    def search(self, message, get_values=False):
+        """
+        Search the message with group's rules. Return a couple with the app's
+        index of the first matching rule and its match object, or `None` if no
+        rule of the group matches. If *get_values* is `True` the match object
+        is replaced by a dictionary with the values of rule's named groups.
+
+        The combined pattern finds the lowest rule matching at the leftmost position,
+        then only the preceding rules are searched on the next positions, because
+        one of them could match later in the message.
+        """
+        literals = self._literals
+        if self.pattern is None:
+            for k, search in enumerate(self._searches):
+                for literal in literals[k]:
+                    if literal not in message:
+                        break
+                else:
+                    match = search(message)
+                    if match is not None:
+                        return self.indexes[k], match.groupdict() if get_values else match
+            return
+
+        match = self.pattern.search(message)
+        if match is None:
+            return
+
+        # A preceding rule could match only later in the message, where its
+        # longest required literal has to be found.
+        k = self.rules_index[match.lastindex]
+        pos = match.start() + 1
+        for j, search in enumerate(self._searches[:k]):
+            if literals[j] and message.find(literals[j][0], pos) < 0:
+                continue
+            rule_match = search(message, pos)
+            if rule_match is not None:
+                return self.indexes[j], rule_match.groupdict() if get_values else rule_match
+
+        if get_values:
+            values = self._value_getters[k](match)
+            return self.indexes[k], dict(zip(self._gids[k], values))
+        return self.indexes[k], self._matches[k](message, match.start())
+
 
 class AppRule(object):
     """
@@ -42,16 +180,19 @@ class AppRule(object):
     Attributes:
         - name: the rule option name in the app configuration file
         - pattern : the compiled regex pattern of the rule
-        - results : dictionary of rule results
+        - results : dictionary of rule results, with tuples of key gids values as keys
         - filter_keys: the filtering keys (all regex groups connected
             to those keys must be not Non to matching a rule)
         - full_match: determine if a rule match represents a full matching
                       for the line (needed for thread matching mode)
         - used_by_report : True if is used by a report rule
         - key_gids : map from gid to result key tuple index
+        - get_key : a function that returns the result key from a dictionary of values
+        - leading_literal : the literal character required at the start of a match
+        - literals : the literal strings required by the pattern, longest first
     """
 
-    def __init__(self, name, pattern, app, filter_keys=None):
+    def __init__(self, name, pattern, app, filter_keys=None, template=None):
         """
         Initialize AppRule.
 
@@ -59,6 +200,10 @@ class AppRule(object):
         :param pattern: the option value that represents the search pattern
         :param app: the application in which the rule is defined
         :param filter_keys: the filtering keys dictionary if the rule is a filter
+        :param template: the pattern with the fields replaced by a non-literal \
+        placeholder, that is shorter to parse for extracting the literals. Only the \
+        fields that are a single item can be replaced. If not provided the literals \
+        are extracted from the pattern.
         """
         try:
             if not pattern:
@@ -67,6 +212,8 @@ class AppRule(object):
         except re.error as err:
             msg = "invalid pattern for app\'s rule {!r}: {}"
             raise LogRaptorConfigError(msg.format(name, str(err)))
+        self.leading_literal, self.literals = \
+            get_pattern_literals(pattern if template is None else template)
 
         key_gids = ['host']
         for gid in self.pattern.groupindex:
@@ -76,14 +223,17 @@ class AppRule(object):
         if not key_gids:
             raise LogRaptorConfigError("key gids set of the rule {!r} is empty!".format(name))
         self.key_gids = tuple(key_gids)
+        self._gid_pos = {gid: k for k, gid in enumerate(key_gids)}
+        self.get_key = tuple_itemgetter(key_gids)
 
         self.name = name
         self.app = app
         self.filter_keys = filter_keys or []
         self.full_match = filter_keys is not None
         self.used_by_report = False
-        self.results = Counter()
+        self.results = defaultdict(int)
         self._last_idx = None
+        self._conditions = {}
 
     def __repr__(self):
         return "%s(name=%r, app=%r)" % (self.__class__.__name__, self.name, self.app.name)
@@ -93,8 +243,8 @@ class AppRule(object):
         Add a tuple or increment the value of an existing one
         in the rule results dictionary.
         """
-        self._last_idx = tuple(values[gid] for gid in self.key_gids)
-        self.results[self._last_idx] += 1
+        self._last_idx = idx = self.get_key(values)
+        self.results[idx] += 1
 
     def increase_last(self, k):
         """
@@ -103,6 +253,24 @@ class AppRule(object):
         if self._last_idx is not None:
             self.results[self._last_idx] += k
 
+    def parse_condition(self, condition):
+        """
+        Parse a report condition (eg. 'user!="root"'). Return a tuple with the
+        position of the condition's field in result keys, a boolean that is `True`
+        for inverted conditions and the search method of the condition pattern.
+        Parsed conditions are cached, because reports repeat the same conditions.
+        """
+        try:
+            return self._conditions[condition]
+        except KeyError:
+            match = CONDITION_PATTERN.search(condition)
+            self._conditions[condition] = (
+                self._gid_pos[match.group(1)],
+                match.group(2) == '!=',
+                re.compile(match.group(3)).search
+            )
+            return self._conditions[condition]
+
     def total_events(self, condition, value_field=None):
         """
         Returns total number of events in the rule's result set. The *condition* selects
@@ -113,7 +281,7 @@ class AppRule(object):
             return sum(self.results.values())
 
         results = self.results
-        val = self.key_gids.index(value_field) if value_field is not None else None
+        val = self._gid_pos[value_field] if value_field is not None else None
 
         if condition == "*":
             tot = 0
@@ -121,14 +289,11 @@ class AppRule(object):
                 tot += results[key] * int(key[val])
             return tot
 
-        match = re.search(r'(\w+)(!=|==)\"([^\"]*)\"', condition)
-        condition_index = self.key_gids.index(match.group(1))
-        invert = (match.group(2) == '!=')
-        condition_pattern = re.compile(match.group(3))
+        condition_index, invert, search = self.parse_condition(condition)
 
         tot = 0
         for key in results:
-            match = condition_pattern.search(key[condition_index])
+            match = search(key[condition_index])
             if (not invert and match is not None) or (invert and match is None):
                 if value_field is None:
                     tot += results[key]
@@ -145,54 +310,35 @@ class AppRule(object):
         should be provided to compute the max of a numeric value field or
         the sum of product of value field with events.
         """
-        def classify():
-            if value is None:
-                return
-
-            for j in range(num):
-                if top[j] is None:
-                    top[j] = [tot, [value]]
-                    break
-                elif tot == top[j][0]:
-                    top[j][1].append(value)
-                    break
-                elif tot > top[j][0]:
-                    top.insert(j, [tot, [value]])
-                    break
-
         if not self.results:
             return []
 
         results = self.results
-        top = [None] * num
-        pos = self.key_gids.index(gid)
-        val = None
+        pos = self._gid_pos[gid]
 
         # Compute top(max) if a value fld is provided
         if value_field is not None:
-            val = self.key_gids.index(value_field)
+            val = self._gid_pos[value_field]
             if usemax:
-                i = 0
-                for key in sorted(results.keys(), key=lambda x: (int(x[val]), x[pos]),
-                                  reverse=True)[:num]:
-                    top[i] = [int(key[val]), [key[pos]]]
-                    i += 1
-                return [res for res in top if res is not None]
-
-        value = None
-        tot = 0
-        for key in sorted(results.keys(), key=lambda x: (x[pos])):
-            if value is None or value != key[pos]:
-                classify()
-                value = key[pos]
-                tot = results[key] if value_field is None else results[key] * int(key[val])
-                continue
-            tot += results[key] if value_field is None else results[key] * int(key[val])
+                return [
+                    [int(key[val]), [key[pos]]]
+                    for key in heapq.nlargest(num, results, key=lambda x: (int(x[val]), x[pos]))
+                ]
+
+        totals = defaultdict(int)
+        if value_field is None:
+            for key, counter in results.items():
+                totals[key[pos]] += counter
         else:
-            classify()
+            for key, counter in results.items():
+                totals[key[pos]] += counter * int(key[val])
+        totals.pop(None, None)
 
-        del top[num:]
-        return [res for res in top if res is not None]
+        # Group the values with the same total, keeping them sorted
+        top = defaultdict(list)
+        for value in sorted(totals):
+            top[totals[value]].append(value)
+        return [[tot, top[tot]] for tot in heapq.nlargest(num, top)]
 
     def list_events(self, cond, cols, fields):
         """
@@ -223,17 +369,14 @@ class AppRule(object):
 
         # Set local variables
         results = self.results
-        pos = [self.key_gids.index(gid) for gid in fields if gid[0] != '"']
+        pos = [self._gid_pos[gid] for gid in fields if gid[0] != '"']
         has_cond = cond != "*"
 
-        # If a condition is passed then compile a pattern matching object
+        # If a condition is passed then get the condition's search function
         if has_cond:
-            match = re.search(r'(\w+)(!=|==)\"([^\"]*)\"', cond)
-            condpos = self.key_gids.index(match.group(1))
-            invert = (match.group(2) == '!=')
-            recond = re.compile(match.group(3))
+            condpos, invert, search = self.parse_condition(cond)
         else:
-            recond = condpos = invert = None
+            search = condpos = invert = None
 
         # Define the row template with places for values and fixed strings
         row_template = []
@@ -245,29 +388,31 @@ class AppRule(object):
 
         # Set the processing table and reduced key length
         keylen = len(pos) - (len(fields) - cols) - 1
+        get_tabkey = tuple_itemgetter(pos[:max(keylen, 0)])
+        get_value = tuple_itemgetter(pos[keylen:])
         tabvalues = dict()
         tabkey = None
 
         reslist = []
-        for key in sorted(results, key=lambda x: x[pos[0]]):
+        for key in sorted(results, key=itemgetter(pos[0])):
             # Skip results that don't satisfy the condition
             if has_cond:
                 try:
-                    match = recond.search(key[condpos])
+                    match = search(key[condpos])
                 except TypeError:
                     continue
                 if ((match is None) and not invert) or ((match is not None) and invert):
                     continue
 
-            new_tabkey = [key[pos[i]] for i in range(keylen)]
+            new_tabkey = get_tabkey(key)
             if tabkey is None:
                 tabkey = new_tabkey
             elif tabkey != new_tabkey:
                 insert_row()
                 tabvalues = dict()
-                tabkey = [key[pos[i]] for i in range(keylen)]
+                tabkey = new_tabkey
 
-            value = tuple([key[k] for k in pos[keylen:]])
+            value = get_value(key)
             if value in tabvalues:
                 tabvalues[value] += results[key]
             else:
@@ -312,8 +457,8 @@ class AppLogParser(object):
         self.config = AppConfig(cfgfiles=cfgfile, appname=name, logdir=logdir)
 
         self.description = self.config.get('main', 'description')
-        self.tags = list(set(re.split(r'\s*,\s*', self.config.get('main', 'tags'))))
-        self._files = list(set(re.split(r'\s*,\s*', self.config.get('main', 'files'))))
+        self.tags = list(set(COMMA_SEPARATOR_PATTERN.split(self.config.get('main', 'tags'))))
+        self._files = list(set(COMMA_SEPARATOR_PATTERN.split(self.config.get('main', 'files'))))
         self.enabled = self.config.getboolean('main', 'enabled')
         self.priority = self.config.getint('main', 'priority')
         self.files = field_multisub(self._files, 'host', args.hosts or ['*'])
@@ -328,7 +473,7 @@ class AppLogParser(object):
             subreports = [sr.name for sr in self._report.subreports]
             self.report_data = [e for e in self.get_report_data() if e.subreport in subreports]
 
-        self.has_filters = any([rule.filter_keys for rule in self.rules])
+        self.has_filters = any(rule.filter_keys for rule in self.rules)
 
         if self.has_filters:
             # If the app has filters, reorder rules putting the filters first.
@@ -338,6 +483,9 @@ class AppLogParser(object):
         else:
             for rule in self.rules:
                 rule.full_match = True
+
+        self._rule_groups = None    # Built at first search, to skip the compile for unused apps
+        self.match_rules = self.create_rules_matcher()
         logger.info('initialized app %r with %d pattern rules', name, len(self.rules))
 
     def __repr__(self):
@@ -361,6 +509,25 @@ class AppLogParser(object):
                 report_data.append(data_item)
         return report_data
 
+    def get_rule_groups(self):
+        """
+        Group the rules by the leading literal of their patterns. The groups
+        are ordered by the position of their first rule.
+        """
+        logger.debug('create rule groups for app %r', self.name)
+        groups = {}
+        for k, rule in enumerate(self.rules):
+            literal = rule.leading_literal
+            try:
+                groups[literal].append(k)
+            except KeyError:
+                groups[literal] = [k]
+
+        return [
+            AppRuleGroup([self.rules[k] for k in indexes], tuple(indexes))
+            for indexes in sorted(groups.values())
+        ]
+
     def parse_rules(self):
         """
         Add a set of rules to the app, dividing between filter and other rule set
@@ -371,22 +538,35 @@ class AppLogParser(object):
         except configparser.NoSectionError:
             raise LogRaptorConfigError("the app %r has no defined rules!" % self.name)
 
+        # The literals of the rules are extracted from the patterns with the fields
+        # replaced by a placeholder, because the field patterns are long to parse.
+        # A field that is not a single item (e.g. with an alternation at top level)
+        # changes the literals required by the rule, so it's kept in the template.
+        placeholders = {
+            k: '(?:.)' if is_embeddable(v) else v for k, v in self.fields.items()
+        }
+
         rules = []
         for option, value in rule_options:
             pattern = value.replace('\n', '')  # Strip newlines for multi-line declarations
             if not self.args.filters:
                 # No filters case: substitute the filter fields with the corresponding patterns.
-                pattern = string.Template(pattern).safe_substitute(self.fields)
-                rules.append(AppRule(option, pattern, self))
+                template = string.Template(pattern)
+                rules.append(AppRule(
+                    option, template.safe_substitute(self.fields), self,
+                    template=template.safe_substitute(placeholders)
+                ))
                 continue
 
             for filter_group in self.args.filters:
                 _pattern, filter_keys = exact_sub(pattern, filter_group)
-                _pattern = string.Template(_pattern).safe_substitute(self.fields)
+                template = string.Template(_pattern)
+                _pattern = template.safe_substitute(self.fields)
+                _template = template.safe_substitute(placeholders)
                 if len(filter_keys) >= len(filter_group):
-                    rules.append(AppRule(option, _pattern, self, filter_keys))
+                    rules.append(AppRule(option, _pattern, self, filter_keys, _template))
                 elif self._thread:
-                    rules.append(AppRule(option, _pattern, self))
+                    rules.append(AppRule(option, _pattern, self, template=_template))
         return rules
 
     def increase_last(self, k):
@@ -398,10 +578,46 @@ class AppLogParser(object):
         except AttributeError:
             pass
 
-    def match_rules(self, log_data):
+    def search_rules(self, message):
         """
-        Process a log line data message with app's pattern rules.
-        Return a tuple with this data:
+        Search the message with app's pattern rules. Return a couple with the first
+        matching rule and its match object, or a couple of `None` if no rule matches.
+        """
+        k, match = self.search_rule_index(message)
+        if match is None:
+            return None, None
+        return self.rules[k], match
+
+    def search_rule_index(self, message, get_values=False):
+        """
+        Search the message with app's pattern rules. Return a couple with the index
+        of the first matching rule and its match object, or a couple of `None` if no
+        rule matches. If *get_values* is `True` the match object is replaced by a
+        dictionary with the values of rule's named groups. The rule groups that
+        start after an already matched rule are skipped.
+        """
+        rule_groups = self._rule_groups
+        if rule_groups is None:
+            rule_groups = self._rule_groups = self.get_rule_groups()
+
+        if len(rule_groups) == 1:
+            return rule_groups[0].search(message, get_values) or (None, None)
+
+        result = None
+        for group in rule_groups:
+            if result is not None and result[0] < group.indexes[0]:
+                break
+            group_result = group.search(message, get_values)
+            if group_result is not None and (result is None or group_result[0] < result[0]):
+                result = group_result
+
+        return result or (None, None)
+
+    def create_rules_matcher(self):
+        """
+        Create the function that processes a log line data message with app's pattern
+        rules. The function is specialized on the app's settings, that don't change
+        during the processing. The function returns a tuple with this data:
 
             Element #0 (app_matched): True if a rule match, False otherwise;
             Element #1 (has_full_match): True if a rule match and is a filter or the
@@ -412,40 +628,109 @@ class AppLogParser(object):
             Element #3 (output_data): Mapping dictionary if a rule match and a map
                 of output is requested (--anonymize/--ip/--uid options).
         """
-        for rule in self.rules:
-            match = rule.pattern.search(log_data.message)
-            if match is not None:
-                gids = rule.pattern.groupindex
-                self._last_rule = rule
-                if self.name_cache is not None:
-                    values = self.name_cache.match_to_dict(match, rule.key_gids)
-                    values['host'] = self.name_cache.map_value(log_data.host, 'host')
-                    output_data = {
-                        'host': values['host'],
-                        'message': self.name_cache.match_to_string(match, gids, values),
-                    }
-                else:
-                    values = {'host': log_data.host}
-                    for gid in gids:
-                        values[gid] = match.group(gid)
-                    output_data = None
-
-                if self._thread and 'thread' in rule.pattern.groupindex:
-                    thread = match.group('thread')
-                    if rule.filter_keys is not None and \
-                            any([values[key] is None for key in rule.filter_keys]):
-                        return False, None, None, None
-                    if self._report:
-                        rule.add_result(values)
-                    return True, rule.full_match, thread, output_data
-                else:
-                    if rule.filter_keys is not None and \
-                            any([values[key] is None for key in rule.filter_keys]):
-                        return False, None, None, None
-                    elif self._report or (rule.filter_keys is not None or not self.has_filters):
-                        rule.add_result(values)
-                    return True, rule.full_match, None, output_data
-
-        # No rule match: the application log message is not parsable with enabled rules.
-        self._last_rule = None
-        return False, None, None, None
+        def map_values(k, match, host):
+            values = rules_match_to_dict[k](match)
+            values['host'] = name_cache.map_value(host, 'host')
+            output_data = {
+                'host': values['host'],
+                'message': rules_match_to_string[k](match, values=values),
+            }
+            return values, output_data
+
+        def thread_match_rules(log_data):
+            k, match = search_rule_index(log_data.message)
+            if match is None:
+                # No rule match: the application log message is not parsable with enabled rules.
+                self._last_rule = None
+                return False, None, None, None
+
+            self._last_rule = rule = rules[k]
+            if name_cache is not None:
+                values, output_data = map_values(k, match, log_data.host)
+            else:
+                values = {'host': log_data.host}
+                values.update(match.groupdict())
+                output_data = None
+
+            for key in rule.filter_keys:
+                if values[key] is None:
+                    return False, None, None, None
+
+            if 'thread' in rule.pattern.groupindex:
+                if report:
+                    rule.add_result(values)
+                return True, rule.full_match, match.group('thread'), output_data
+            rule.add_result(values)
+            return True, rule.full_match, None, output_data
+
+        def mapped_match_rules(log_data):
+            k, match = search_rule_index(log_data.message)
+            if match is None:
+                self._last_rule = None
+                return False, None, None, None
+
+            self._last_rule = rules[k]
+            values, output_data = map_values(k, match, log_data.host)
+            for key in filter_keys[k]:
+                if values[key] is None:
+                    return False, None, None, None
+            add_results[k](values)
+            return True, full_matches[k], None, output_data
+
+        def filter_match_rules(log_data):
+            k, values = search_rule_index(log_data.message, True)
+            if values is None:
+                self._last_rule = None
+                return False, None, None, None
+
+            self._last_rule = rule = rules[k]
+            values.setdefault('host', log_data.host)
+            for key in filter_keys[k]:
+                if values[key] is None:
+                    return False, None, None, None
+
+            # Add the result inline, saving the call of rule.add_result()
+            rule._last_idx = idx = get_keys[k](values)
+            results[k][idx] += 1
+            return True, full_matches[k], None, None
+
+        def match_rules(log_data):
+            k, values = search_rule_index(log_data.message, True)
+            if values is None:
+                self._last_rule = None
+                return False, None, None, None
+
+            self._last_rule = rule = rules[k]
+            values.setdefault('host', log_data.host)
+            rule._last_idx = idx = get_keys[k](values)
+            results[k][idx] += 1
+            return True, True, None, None
+
+        search_rule_index = self.search_rule_index
+        name_cache = self.name_cache
+        report = self._report
+
+        # Rule attributes by rule index, for avoiding attribute lookups at each match
+        rules = self.rules
+        filter_keys = [tuple(rule.filter_keys) for rule in rules]
+        full_matches = [rule.full_match for rule in rules]
+        add_results = [rule.add_result for rule in rules]
+        get_keys = [rule.get_key for rule in rules]
+        results = [rule.results for rule in rules]
+
+        if name_cache is not None:
+            rules_match_to_dict = [
+                partial(name_cache.match_to_dict, gids=rule.key_gids) for rule in rules
+            ]
+            rules_match_to_string = [
+                partial(name_cache.match_to_string, gids=rule.pattern.groupindex) for rule in rules
+            ]
+
+        if self._thread:
+            return thread_match_rules
+        elif name_cache is not None:
+            return mapped_match_rules
+        elif self.has_filters:
+            return filter_match_rules
+        else:
+            return match_rules
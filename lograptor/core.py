@@ -28,7 +28,7 @@ import logging
 import fileinput
 import sys
 import fnmatch
-from collections import Counter
+from collections import Counter, OrderedDict
 
 from .exceptions import LogRaptorConfigError, FileMissingError, \
     LogFormatError, LogRaptorOptionError, LogRaptorArgumentError
@@ -41,7 +41,8 @@ from .dispatchers import UnbufferedDispatcher, LineBufferDispatcher, ThreadedDis
 from .report import Report
 from .channels import TermChannel, MailChannel, FileChannel
 from .timedate import get_datetime_interval
-from .utils import is_pipe, is_redirected, protected_property, normalize_path, safe_expand
+from .utils import is_pipe, is_redirected, protected_property, normalize_path, \
+    safe_expand, get_leading_literal, is_combinable
 
 logger = logging.getLogger(__package__)
 
@@ -254,11 +255,32 @@ class LogRaptor(object):
             logger.info("an empty pattern provided: match all strings!")
             return tuple()
 
+        # Join the patterns that start with the same literal into an alternation, so
+        # the regex engine can skip quickly to the positions of the common prefix.
+        # Inside a group longer patterns are put first, so when more alternatives match
+        # at the same position the longest is preferred, like the leftmost-longest
+        # match of grep. Patterns with capturing groups are kept apart, because the
+        # outer group must be the only one for -o and for the colored output.
+        groups = OrderedDict()
+        for pat in sorted(patterns):
+            try:
+                joinable = is_combinable(pat) and re.compile(pat).groups == 0
+            except re.error:
+                joinable = False  # The syntax error is reported when compiling
+            literal = get_leading_literal(pat) if joinable else None
+            groups.setdefault(literal or (pat,), []).append(pat)
+
+        patterns = [
+            items[0] if len(items) == 1 else '(?:%s)' % '|'.join(
+                '(?:%s)' % pat for pat in sorted(items, key=lambda x: (-len(x), x))
+            )
+            for items in groups.values()
+        ]
         try:
             flags = re.IGNORECASE if self.args.ignore_case else 0 | re.UNICODE
             return tuple([
                 re.compile(r'(\b%s\b)' % pat if self.args.word else '(%s)' % pat, flags=flags)
-                for pat in patterns if pat
+                for pat in patterns
             ])
         except re.error as err:
             raise LogRaptorArgumentError('wrong regex syntax for pattern: %r' % err)
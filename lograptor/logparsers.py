@@ -22,6 +22,10 @@ This module defines classes and methods for parsing log headers.
 import re
 from collections import namedtuple
 from .exceptions import LogRaptorConfigError
+from .utils import is_combinable, unname_groups
+
+# Fields that are always included in log data, with a `None` value if missing in the pattern
+OPTIONAL_FIELDS = ('year', 'host', 'apptag', 'repeat')
 
 
 class LogParser(object):
@@ -35,8 +39,13 @@ class LogParser(object):
         """
         self.parser = re.compile(pattern)
         self.app = app
+        if type(self).match is LogParser.match:
+            self.match = self.parser.match  # Skip the wrapper call if not overridden
         self.fields = tuple(self.parser.groupindex.keys())
-        self.LogData = namedtuple('LogData', self.fields)
+        missing = tuple(field for field in OPTIONAL_FIELDS if field not in self.fields)
+        self.LogData = namedtuple('LogData', self.fields + missing)
+        self.defaults = (None,) * len(missing)
+        self.group_indexes = tuple(self.parser.groupindex[field] for field in self.fields)
 
         for field in ('month', 'day', 'ltime', 'message'):
             if field not in self.parser.groupindex:
@@ -47,7 +56,9 @@ class LogParser(object):
         return self.parser.match(line)
 
     def get_data(self, match):
-        return self.LogData(*map(match.group, self.fields))
+        # Read the groups by index with a single call and build the
+        # namedtuple instance directly, skipping its __new__ checks.
+        return tuple.__new__(self.LogData, match.group(*self.group_indexes) + self.defaults)
 
 
 class ParserRFC3164(LogParser):
@@ -111,6 +122,7 @@ class CycleParsers(object):
         self.parsers = parsers or self.PARSERS
         self.index = 0
         self.num_parsers = len(self.parsers)
+        self.detector = self.combine_parsers(self.parsers)
 
     def __iter__(self):
         return self
@@ -122,7 +134,34 @@ class CycleParsers(object):
     def next(self):
         return self.__next__()
 
+    @staticmethod
+    def combine_parsers(parsers):
+        """
+        Combine the patterns of the parsers into a single alternation pattern, with
+        the named groups turned into unnamed groups. The combined pattern is used by
+        `detect` to skip the lines that no parser matches with a single regex match.
+        Returns `None` if there is only one parser or if the patterns cannot be
+        combined.
+        """
+        if len(parsers) < 2:
+            return
+
+        for p in parsers:
+            if type(p).match is not LogParser.match or p.parser.flags != re.UNICODE \
+                    or not is_combinable(p.parser.pattern):
+                return
+
+        try:
+            return re.compile('|'.join(
+                '(?:%s)' % unname_groups(p.parser.pattern) for p in parsers
+            ))
+        except re.error:
+            return
+
     def detect(self, line):
+        if self.detector is not None and self.detector.match(line) is None:
+            return None, None
+
         for i in range(self.num_parsers):
             parser = self.__next__()
             match = parser.match(line)
@@ -21,25 +21,28 @@ This module define the matcher engine of lograptor package.
 #
 import sys
 import os
+import io
+import re
 import time
 import datetime
 import logging
 from collections import namedtuple, Counter
+from functools import lru_cache
 
 
 from .logparsers import CycleParsers
 from .tui import ProgressBar
-from .utils import open_resource
+from .utils import open_resource, get_required_literals
 
 logger = logging.getLogger(__name__)
 
 
 # Map for month field from any admitted representation to numeric.
 MONTHMAP = {
-    'Jan': '01', 'Feb': '02', 'Mar': '03', 'Apr': '04', 'May': '05', 'Jun': '06',
-    'Jul': '07', 'Aug': '08', 'Sep': '09', 'Oct': '10', 'Nov': '11', 'Dec': '12',
-    '01': '01', '02': '02', '03': '03', '04': '04', '05': '05', '06': '06',
-    '07': '07', '08': '08', '09': '09', '10': '10', '11': '11', '12': '12'
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+    '01': 1, '02': 2, '03': 3, '04': 4, '05': 5, '06': 6,
+    '07': 7, '08': 8, '09': 9, '10': 10, '11': 11, '12': 12
 }
 
 NILVALUE = '-'  # RFC-5424 NILVALUE
@@ -49,17 +52,20 @@ MatcherResult = namedtuple(
 )
 
 
+@lru_cache(maxsize=1024)
+def get_hour_mktime(year, month, day, hour):
+    """
+    Returns the local time in seconds since the epoch of the start of an hour.
+    The UTC offset changes only at hour boundaries, so the times of consecutive
+    log lines are computed adding the minutes and the seconds to a cached value.
+    """
+    return time.mktime((int(year), MONTHMAP[month], int(day), int(hour), 0, 0, 0, 0, -1))
+
+
 def get_mktime(year, month, day, ltime):
     try:
-        return time.mktime((
-            int(year),
-            int(MONTHMAP[month]),
-            int(day),
-            int(ltime[:2]),     # Hour
-            int(ltime[3:5]),    # Minute
-            int(ltime[6:]),     # Second
-            0, 0, -1
-        ))
+        return get_hour_mktime(year, month, day, ltime[:2]) + \
+            int(ltime[3:5]) * 60 + int(ltime[6:])
     except (KeyError, ValueError):
         return None
 
@@ -75,17 +81,41 @@ def get_mktime_period(time_period):
         return start_dt, time.mktime((2222, 2, 2, 0, 0, 0, 0, 0, 0))
 
 
+class AppTagsMap(dict):
+    """
+    A map from app-tags to applications. An app-tag that is not a key is mapped
+    to the applications of the tags that are a prefix of it. The result is cached,
+    so the tags are scanned only once for each unknown app-tag.
+
+    :param tags: dictionary with a map from app-tags to application.
+    """
+    def __init__(self, tags):
+        super(AppTagsMap, self).__init__(tags)
+        self.tags = tags
+
+    def __missing__(self, apptag):
+        if len(self) >= len(self.tags) + 4096:
+            self.clear()
+            self.update(self.tags)
+
+        self[apptag] = tag_apps = [
+            app for tag, _apps in self.tags.items() if apptag.startswith(tag)
+            for app in _apps
+        ]
+        return tag_apps
+
+
 def get_app(log_data, apps, tags, extra_tags):
     """
     Selects the application for log data matching.
 
     :param log_data: log data regex match.
     :param apps: the list of loaded applications.
-    :param tags: dictionary with a map from app-tags to application.
+    :param tags: an AppTagsMap instance with a map from app-tags to applications.
     :param extra_tags: a counter map for unknown app-tags.
     :return: an application instance if a match is found, `None` otherwise.
     """
-    apptag = getattr(log_data, 'apptag', None)
+    apptag = log_data.apptag
     if apptag is None or apptag == NILVALUE or apptag.isdigit():
         # The app-tag is missing or has not a significative value
         for app in apps:
@@ -94,17 +124,11 @@ def get_app(log_data, apps, tags, extra_tags):
         return
 
     # Find app using the app-tag
-    try:
-        tag_apps = tags[apptag]
-    except KeyError:
-        tag_apps = [
-            app for tag, _apps in tags.items() if apptag.startswith(tag)
-            for app in _apps
-        ]
+    tag_apps = tags[apptag]
 
     if not tag_apps:
         # Tag unmatched, skip the line
-        extra_tags.update([apptag])
+        extra_tags[apptag] += 1
         return
     elif len(tag_apps) == 1:
         return tag_apps[0]
@@ -118,41 +142,87 @@ def get_app(log_data, apps, tags, extra_tags):
             return tag_apps[0]
 
 
-def create_cached_host_matcher():
+def create_cached_host_matcher(hosts):
     """
     Create a matcher for hostname patterns. If the log line data
     doesn't include host information considers the line as matched.
-    The matcher has a cache for speed-up matching.
+    The host patterns are searched together with a single combined
+    pattern and the matcher has a cache for both matching and not
+    matching hostnames.
+
+    :param hosts: a list of compiled hostname patterns.
     """
-    def has_host_match(log_data, hosts):
+    def has_host_match(log_data):
+        hostname = log_data.host
         try:
-            hostname = log_data.host
-        except AttributeError:
-            return True
-        else:
-            if hostname in host_cache:
-                return True
+            return host_cache[hostname]
+        except KeyError:
+            if len(host_cache) >= 4096:
+                host_cache.clear()
+                host_cache.update({None: True, '': True})
+            host_cache[hostname] = result = search(hostname) is not None
+            return result
+
+    search = re.compile('|'.join('(?:%s)' % h.pattern for h in hosts)).search
+    host_cache = {None: True, '': True}
+    return has_host_match
 
-        for host_pattern in hosts:
-            if host_pattern.search(hostname) is not None:
-                host_cache.add(hostname)
-                return True
-        else:
-            return False
 
-    host_cache = {None, ''}
-    return has_host_match
+def create_prefiltered_search(regexp):
+    """
+    Create a search function for a pattern. If the pattern requires a literal
+    string the function checks it with a substring test before running the
+    regex search, so lines without the literal are skipped quickly.
+
+    :param regexp: a compiled regex pattern.
+    """
+    def prefiltered_search(line):
+        if literal in line:
+            return search(line)
+
+    literals = get_required_literals(regexp.pattern, regexp.flags)
+    if not literals:
+        return regexp.search
+
+    literal = literals[0]
+    search = regexp.search
+    return prefiltered_search
+
+
+def iter_progress(lines, progress_bar):
+    """
+    Iterates over lines, redrawing a progress bar every 100 lines. Used only
+    when the progress bar is displayed, so the matcher's loop has no check
+    for it.
+
+    :param lines: an iterable of text lines.
+    :param progress_bar: a ProgressBar instance.
+    """
+    read_size = 0
+    redraw_countdown = 100
+    for line in lines:
+        read_size += len(line)
+        redraw_countdown -= 1
+        if not redraw_countdown:
+            redraw_countdown = 100
+            progress_bar.redraw(read_size)
+        yield line
 
 
 ##
-# Pattern search functions
+# Pattern search functions (patterns are search functions)
+
+def any_pattern_search(line, patterns):
+    return True, None, line
+
+
+def no_pattern_search(line, patterns):
+    return False, None, line
 
-def inverted_pattern_search(line, patterns):
-    if not patterns:
-        return False, None, line
 
-    for regexp in patterns:
-        match = regexp.search(line)
+def inverted_pattern_search(line, patterns):
+    for search in patterns:
+        match = search(line)
         if match is not None:
             return False, match, line
     else:
@@ -160,11 +230,8 @@ def inverted_pattern_search(line, patterns):
 
 
 def matching_pattern_search(line, patterns):
-    if not patterns:
-        return True, None, line
-
-    for regexp in patterns:
-        match = regexp.search(line)
+    for search in patterns:
+        match = search(line)
         if match is not None:
             return True, match, '%s\n' % match.group(1)
     else:
@@ -172,11 +239,8 @@ def matching_pattern_search(line, patterns):
 
 
 def normal_pattern_search(line, patterns):
-    if not patterns:
-        return True, None, line
-
-    for regexp in patterns:
-        match = regexp.search(line)
+    for search in patterns:
+        match = search(line)
         if match is not None:
             return True, match, line
     else:
@@ -197,9 +261,18 @@ def create_matcher(dispatcher, parsers, apptags, matcher='ruled', hosts=(), time
     select_unparsed = matcher == 'unparsed'
     register_log_lines = not (quiet or count or files_with_match is not None)
     start_dt, end_dt = get_mktime_period(time_period)
-    has_host_match = create_cached_host_matcher() if hosts else None
+    apptags = AppTagsMap(apptags)
+    single_apps = {
+        tag: tag_apps[0] for tag, tag_apps in apptags.items()
+        if len(tag_apps) == 1 and tag != NILVALUE and not tag.isdigit()
+    }
+    get_single_app = single_apps.get
+    has_host_match = create_cached_host_matcher(hosts) if hosts else None
+    patterns = [create_prefiltered_search(regexp) for regexp in patterns]
 
-    if invert:
+    if not patterns:
+        pattern_search = no_pattern_search if invert else any_pattern_search
+    elif invert:
         pattern_search = inverted_pattern_search
     elif only_matching:
         pattern_search = matching_pattern_search
@@ -213,6 +286,8 @@ def create_matcher(dispatcher, parsers, apptags, matcher='ruled', hosts=(), time
 
     def process_logfile(source, apps, encoding='utf-8'):
         log_parser = next(parsers)
+        parser_match, get_log_data, parser_app = \
+            log_parser.match, log_parser.get_data, log_parser.app
         first_event = None
         last_event = None
         app_thread = None
@@ -222,8 +297,8 @@ def create_matcher(dispatcher, parsers, apptags, matcher='ruled', hosts=(), time
         selected_counter = 0
         extra_tags = Counter()
         dispatcher.reset()
-        read_size = 0
         progress_bar = None
+        event_times = {}
 
         with open_resource(source) as logfile:
             # Set counters and status
@@ -235,47 +310,45 @@ def create_matcher(dispatcher, parsers, apptags, matcher='ruled', hosts=(), time
             file_month = file_mtime.month
             prev_year = file_year - 1
 
+            # Decode the file by chunks instead of line by line, splitting lines only on '\n'
+            lines = io.TextIOWrapper(logfile, encoding=encoding, newline='\n')
             if display_progress_bar:
-                read_size = 0
                 progress_bar = ProgressBar(sys.stdout, fstat.st_size, logfile_name)
+                lines = iter_progress(lines, progress_bar)
 
-            for line in logfile:
-                line = line.decode(encoding)
+            for line in lines:
                 line_counter += 1
                 if line[-1] != '\n':
                     line += '\n'
 
-                if display_progress_bar:
-                    read_size += len(line)
-                    if not line_counter % 100:
-                        progress_bar.redraw(read_size)
-
                 ###
                 # Parses the line and extracts the log data
-                log_match = log_parser.match(line)
+                log_match = parser_match(line)
                 if log_match is None:
                     # The current parser doesn't match: try another available parser.
                     next_parser, log_match = parsers.detect(line)
                     if log_match is not None:
                         log_parser = next_parser
+                        parser_match, get_log_data, parser_app = \
+                            log_parser.match, log_parser.get_data, log_parser.app
                     elif line_counter == 1:
                         logger.warning("the file %r has an unknown format, skip ...", logfile_name)
                         break
                     else:
                         unknown_counter += 1
                         continue
-                log_data = log_parser.get_data(log_match)
+                log_data = get_log_data(log_match)
 
                 ###
                 # Process last event repetition
                 # (eg. 'last message repeated N times' RFC 3164's logs)
-                if getattr(log_data, 'repeat', None) is not None:
+                if log_data.repeat is not None:
                     if selected_data is not None:
                         repeat = int(log_data.repeat)
                         if not thread:
                             selected_counter += repeat
                         if use_app_rules:
-                            app = log_parser.app or \
+                            app = parser_app or \
                                 get_app(selected_data, apps, apptags, extra_tags)
                             app.increase_last(repeat)
                             app.matches += 1
@@ -290,17 +363,23 @@ def create_matcher(dispatcher, parsers, apptags, matcher='ruled', hosts=(), time
                 selected_data = None
 
                 ###
-                # Parse the log's timestamp and gets the event datetime
-                year = getattr(
-                    log_data, 'year',
-                    prev_year if MONTHMAP[log_data.month] != '01' and file_month == 1 else file_year
-                )
-                event_dt = get_mktime(
-                    year=year,
-                    month=log_data.month,
-                    day=log_data.day,
-                    ltime=log_data.ltime
-                )
+                # Parse the log's timestamp and gets the event datetime. The datetimes
+                # are cached because consecutive lines often share the same timestamp.
+                timestamp = log_data.month, log_data.day, log_data.ltime, log_data.year
+                try:
+                    event_dt = event_times[timestamp]
+                except KeyError:
+                    month, year = log_data.month, log_data.year
+                    if year is None:
+                        year = prev_year if MONTHMAP[month] != 1 and file_month == 1 else file_year
+                    if len(event_times) >= 4096:
+                        event_times.clear()
+                    event_dt = event_times[timestamp] = get_mktime(
+                        year=year,
+                        month=month,
+                        day=log_data.day,
+                        ltime=log_data.ltime
+                    )
 
                 ###
                 # Scope exclusions
@@ -318,7 +397,7 @@ def create_matcher(dispatcher, parsers, apptags, matcher='ruled', hosts=(), time
                 elif time_range is not None and not time_range.between(log_data.ltime):
                     # Excludes lines not in time range
                     continue
-                elif hosts and not has_host_match(log_data, hosts):
+                elif hosts and not has_host_match(log_data):
                     # Excludes lines with host restriction
                     continue
 
@@ -331,7 +410,8 @@ def create_matcher(dispatcher, parsers, apptags, matcher='ruled', hosts=(), time
 
                 ###
                 # App parsing: get the app from parser or from the log data
-                app = log_parser.app or get_app(log_data, apps, apptags, extra_tags)
+                app = parser_app or get_single_app(log_data.apptag) or \
+                    get_app(log_data, apps, apptags, extra_tags)
                 if app is None:
                     # Unmatchable tag --> skip the line
                     continue
@@ -373,11 +453,10 @@ def create_matcher(dispatcher, parsers, apptags, matcher='ruled', hosts=(), time
                 if first_event is None:
                     first_event = event_dt
                     last_event = event_dt
-                else:
-                    if first_event > event_dt:
-                        first_event = event_dt
-                    if last_event < event_dt:
-                        last_event = event_dt
+                elif event_dt > last_event:
+                    last_event = event_dt
+                elif event_dt < first_event:
+                    first_event = event_dt
 
                 if pattern_matched:
                     if max_matches and selected_counter >= max_matches:
@@ -21,7 +21,11 @@ import os
 import io
 import stat
 import string
+import re
+import sre_parse
+import sre_constants
 from functools import wraps
+from operator import itemgetter
 from urllib.request import urlopen
 
 from .tui import ProgressBar
@@ -232,6 +236,159 @@ def safe_expand(template, substitution_map):
         raise ValueError("substitution map has a circularity!")
 
 
+NAMED_GROUP_PATTERN = re.compile(r'(?<!\\)\(\?P<\w+>')
+
+# Patterns with references to groups, conditional groups or inline flags
+UNCOMBINABLE_PATTERN = re.compile(r'\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]')
+
+
+def is_combinable(pattern):
+    """
+    Returns `True` if a regex pattern can be combined with other patterns into an
+    alternation, with its named groups turned into unnamed groups. Patterns with
+    references to groups, conditional groups or inline flags are not combinable.
+
+    :param pattern: a regex pattern string.
+    """
+    return UNCOMBINABLE_PATTERN.search(pattern) is None
+
+
+GLOBAL_FLAGS_PATTERN = re.compile(r'\(\?[aiLmsux]+\)')
+
+
+def is_embeddable(pattern):
+    """
+    Returns `True` if a regex pattern is a single item when embedded into another
+    pattern, so it can be replaced by a group without changing the structure of the
+    other pattern. Patterns with an alternation at top level, with unbalanced
+    parentheses or with global inline flags are not embeddable.
+
+    :param pattern: a regex pattern string.
+    """
+    depth = 0
+    k, length = 0, len(pattern)
+    while k < length:
+        char = pattern[k]
+        if char == '\\':
+            k += 1
+        elif char == '[':
+            # Skip the character set, the first ']' (also after '^') is a literal
+            k += 2 if pattern[k + 1:k + 2] == '^' else 1
+            k += 1 if pattern[k:k + 1] == ']' else 0
+            while k < length and pattern[k] != ']':
+                k += 2 if pattern[k] == '\\' else 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            if not depth:
+                return False
+            depth -= 1
+        elif char == '|' and not depth:
+            return False
+        k += 1
+
+    return not depth and GLOBAL_FLAGS_PATTERN.search(pattern) is None
+
+
+def unname_groups(pattern):
+    """
+    Turns the named groups of a regex pattern into unnamed groups.
+
+    :param pattern: a regex pattern string.
+    """
+    return NAMED_GROUP_PATTERN.sub('(', pattern)
+
+
+def get_pattern_literals(pattern, flags=0):
+    """
+    Returns a couple with the leading literal and the required literals of a regex
+    pattern, computed from a single parse of the pattern. The leading literal is the
+    literal character that the pattern must match at its start, or `None` if the
+    pattern doesn't start with a literal. A literal that starts a capturing group is
+    not considered. The required literals are the literal strings that the pattern
+    requires in any matching text, ordered by decreasing length. The list is empty
+    if the pattern has no literal or matches ignoring the case.
+
+    :param pattern: a regex pattern string.
+    :param flags: the flags used for compiling the pattern.
+    """
+    def scan(items):
+        for op, av in items:
+            if op is sre_constants.LITERAL:
+                literals[-1] += chr(av)
+            elif op is sre_constants.SUBPATTERN and \
+                    not (len(av) > 2 and av[1] & sre_constants.SRE_FLAG_IGNORECASE):
+                scan(av[-1])  # Scoped flags are in the subpattern tuple only from Python 3.6
+            else:
+                literals.append('')
+
+    try:
+        items = sre_parse.parse(pattern, flags)
+    except sre_constants.error:
+        return None, []
+
+    leading_literal = None
+    subpattern = items
+    while len(subpattern):
+        op, av = subpattern[0]
+        if op is sre_constants.LITERAL:
+            leading_literal = chr(av)
+        elif op is sre_constants.SUBPATTERN and av[0] is None:
+            subpattern = av[-1]
+            continue
+        elif op is sre_constants.IN and len(av) == 1 and av[0][0] is sre_constants.LITERAL:
+            leading_literal = chr(av[0][1])
+        break
+
+    # The parser state is available as 'pattern' attribute before Python 3.8
+    state = getattr(items, 'state', None) or items.pattern
+    if state.flags & sre_constants.SRE_FLAG_IGNORECASE:
+        return leading_literal, []
+
+    literals = ['']
+    scan(items)
+    return leading_literal, sorted(filter(None, literals), key=len, reverse=True)
+
+
+def get_leading_literal(pattern):
+    """
+    Returns the literal character that a regex pattern must match at its start,
+    or `None` if the pattern doesn't start with a literal. A literal that starts
+    a capturing group is not considered.
+
+    :param pattern: a regex pattern string.
+    """
+    return get_pattern_literals(pattern)[0]
+
+
+def get_required_literals(pattern, flags=0):
+    """
+    Returns the list of literal strings that a regex pattern requires in any matching
+    text, ordered by decreasing length. The list is empty if the pattern has no
+    literal or matches ignoring the case.
+
+    :param pattern: a regex pattern string.
+    :param flags: the flags used for compiling the pattern.
+    """
+    return get_pattern_literals(pattern, flags)[1]
+
+
+def tuple_itemgetter(items):
+    """
+    Like `operator.itemgetter()` but the returned callable always returns a tuple,
+    also if the items are one or none.
+
+    :param items: a sequence of items (keys or indexes).
+    """
+    if len(items) > 1:
+        return itemgetter(*items)
+    elif items:
+        getter = itemgetter(items[0])
+        return lambda obj: (getter(obj),)
+    else:
+        return lambda obj: ()
+
+
 def results_to_string(results):
     return ', '.join([
         '%s(%s)' % (key, results[key])
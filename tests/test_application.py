@@ -0,0 +1,201 @@
+#
+# Copyright (C), 2011-2020, by SISSA - International School for Advanced Studies.
+#
+# This file is part of lograptor.
+#
+# Lograptor is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# file 'LICENSE' in the root directory of the present distribution
+# for more details.
+#
+# @Author Davide Brunato <brunato@sissa.it>
+#
+import os
+import tempfile
+import pytest
+from collections import namedtuple
+
+import lograptor
+from lograptor.application import AppLogParser, combine_rules
+
+APP_CONFIG = """
+[main]
+description = Test application
+tags = test
+files = ${logdir}/test.log
+enabled = yes
+priority = 0
+
+[rules]
+%s
+"""
+
+
+class TestAppLogParser(object):
+
+    cli_parser = lograptor.api.create_argument_parser()
+
+    def setup_method(self, method):
+        print("\n%s:%s" % (type(self).__name__, method.__name__))
+
+    def create_app(self, rules, cmd_line='-e foo', fields=None):
+        args = self.cli_parser.parse_args(cmd_line.split())
+        with tempfile.TemporaryDirectory() as dirname:
+            cfgfile = os.path.join(dirname, 'test.conf')
+            with open(cfgfile, 'w') as fp:
+                fp.write(APP_CONFIG % '\n'.join(rules))
+            return AppLogParser('test', cfgfile, args, dirname, fields=fields or {})
+
+    def test_combine_rules(self):
+        app = self.create_app([
+            r'Bar_Rule = bar=(?P<bar>\d+)',
+            r'Foo_Rule = foo=(?P<foo>\d+)',
+        ])
+        pattern, rules_index = combine_rules(app.rules)
+        assert pattern.pattern == r'(?:bar=(\d+))(?P<_r0>)|(?:foo=(\d+))(?P<_r1>)'
+        assert rules_index == {2: 0, 4: 1}
+        assert combine_rules([]) is None
+
+        app = self.create_app([r'Bar_Rule = (?P<bar>\w+)=\1'])
+        assert combine_rules(app.rules) is None
+        rule, match = app.search_rules('bar=bar')
+        assert rule is app.rules[0]
+        assert match.group('bar') == 'bar'
+
+    def test_search_rules(self):
+        app = self.create_app([
+            r'Bar_Rule = bar=(?P<bar>\d+)',
+            r'Foo_Rule = foo=(?P<foo>\d+)',
+        ])
+        rule, match = app.search_rules('foo=1 bar=2')
+        assert rule.name == 'Bar_Rule'
+        assert match.group('bar') == '2'
+
+        rule, match = app.search_rules('foo=1 bar=x')
+        assert rule.name == 'Foo_Rule'
+        assert match.group('foo') == '1'
+        assert match.span() == (0, 5)
+
+        assert app.search_rules('foo=x bar=x') == (None, None)
+
+    def test_add_result(self):
+        app = self.create_app([
+            r'Bar_Rule = bar=(?P<bar>\d+)',
+            r'Foo_Rule = foo=\d+',
+        ])
+        app.rules[0].add_result({'host': 'alpha', 'bar': '1'})
+        app.rules[0].add_result({'host': 'alpha', 'bar': '1'})
+        assert app.rules[0].results == {('alpha', '1'): 2}
+
+        app.rules[1].add_result({'host': 'beta'})
+        app.rules[1].increase_last(3)
+        assert app.rules[1].results == {('beta',): 4}
+
+    def test_total_events(self):
+        app = self.create_app([r'Login_Rule = user=(?P<user>\w+) size=(?P<size>\d+)'])
+        rule = app.rules[0]
+        for user, size in [('root', '10'), ('alice', '20'), ('bob', '30'), ('alice', '40')]:
+            rule.add_result({'host': 'alpha', 'user': user, 'size': size})
+
+        assert rule.total_events('*') == 4
+        assert rule.total_events('*', 'size') == 100
+        assert rule.total_events('user!="root"') == 3
+        assert rule.total_events('user=="alice"', 'size') == 60
+
+        condition = rule.parse_condition('user!="root"')
+        assert condition[:2] == (1, True)
+        assert rule.parse_condition('user!="root"') is condition
+
+    def test_top_events(self):
+        app = self.create_app([r'Login_Rule = user=(?P<user>\w+) size=(?P<size>\d+)'])
+        rule = app.rules[0]
+        for user, size in [('root', '10'), ('alice', '20'), ('bob', '30'), ('alice', '40'),
+                           ('carol', '5'), ('carol', '5')]:
+            rule.add_result({'host': 'alpha', 'user': user, 'size': size})
+
+        assert rule.top_events(2, None, False, 'user') == \
+            [[2, ['alice', 'carol']], [1, ['bob', 'root']]]
+        assert rule.top_events(1, 'size', False, 'user') == [[60, ['alice']]]
+        assert rule.top_events(2, 'size', True, 'user') == [[40, ['alice']], [30, ['bob']]]
+
+    def test_search_rules_with_fields(self):
+        app = self.create_app([r'Login_Rule = login ${user} ok'], fields={'user': 'root|admin'})
+        rule, match = app.search_rules('sudo admin ok')
+        assert rule is app.rules[0]
+        assert match.group() == 'admin ok'
+
+        with pytest.warns(DeprecationWarning):  # Flags not at the start of the pattern
+            app = self.create_app([r'Login_Rule = USER ${user} LOGGED'],
+                                  fields={'user': '(?i)[a-z]+'})
+        rule, match = app.search_rules('user bob logged')
+        assert rule is app.rules[0]
+
+        app = self.create_app([r'Login_Rule = login ${user} ok'], fields={'user': r'(\w+|-)'})
+        assert app.rules[0].literals == ['login ', ' ok']
+        assert app.search_rules('sudo admin ok') == (None, None)
+
+    def test_search_rule_values(self):
+        app = self.create_app([
+            r'Bar_Rule = bar=(?P<bar>\d+)(?: (\w+))? baz=(?P<baz>\w+)',
+            r'Foo_Rule = foo=(?P<foo>\d+)',
+        ])
+        assert app.search_rule_index('foo=1 bar=2 x baz=3', True) == (0, {'bar': '2', 'baz': '3'})
+        assert app.search_rule_index('foo=1 bar=2 baz=3', True) == (0, {'bar': '2', 'baz': '3'})
+        assert app.search_rule_index('foo=1', True) == (1, {'foo': '1'})
+        assert app.search_rule_index('bar=1', True) == (None, None)
+
+    def test_search_combined_rules(self):
+        app = self.create_app([
+            r'Alpha_Rule = (?P<alpha>[a-z])(?P<num>\d)',
+            r'Upper_Rule = (?P<num>\d)(?P<upper>[A-Z])',
+        ])
+        assert app.search_rule_index('1X a2', True) == (0, {'alpha': 'a', 'num': '2'})
+        assert app.search_rule_index('1X A2', True) == (1, {'num': '1', 'upper': 'X'})
+        rule, match = app.search_rules('1X a2')
+        assert rule.name == 'Alpha_Rule'
+        assert match.span() == (3, 5)
+        assert app._rule_groups[0].pattern is not None
+
+    def test_search_empty_matching_rules(self):
+        app = self.create_app([
+            r'Pid_Rule = (?P<pid>\d+)',
+            r'Other_Rule = (?P<text>.*)',
+        ])
+        LogData = namedtuple('LogData', 'host message')
+        assert app.match_rules(LogData('h', 'session opened'))[0] is True
+        assert app.search_rule_index('session opened', True) == (1, {'text': 'session opened'})
+        assert app.search_rule_index('session 42', True) == (0, {'pid': '42'})
+        assert app.search_rule_index('', True) == (1, {'text': ''})
+
+    def test_search_calls_are_bounded(self):
+        app = self.create_app([
+            r'Pid_Rule = (?P<pid>\d+)',
+            r'Other_Rule = (?P<text>.*)',
+        ])
+        app.search_rules('')
+        group = app._rule_groups[0]
+        calls = []
+
+        def counted(search):
+            def wrapper(*args):
+                calls.append(args)
+                return search(*args)
+            return wrapper
+
+        # One combined search and one search for each preceding rule
+        Pattern = namedtuple('Pattern', 'search')
+        group.pattern = Pattern(counted(group.pattern.search))
+        group._searches = [counted(search) for search in group._searches]
+        message = 'session opened for user root by admin ' * 5
+        assert app.search_rule_index(message, True) == (1, {'text': message})
+        assert len(calls) == 2
+
+        del calls[:]
+        assert app.search_rule_index(message + '42', True) == (0, {'pid': '42'})
+        assert len(calls) == 2
@@ -0,0 +1,67 @@
+#
+# Copyright (C), 2011-2020, by SISSA - International School for Advanced Studies.
+#
+# This file is part of lograptor.
+#
+# Lograptor is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# file 'LICENSE' in the root directory of the present distribution
+# for more details.
+#
+# @Author Davide Brunato <brunato@sissa.it>
+#
+import re
+
+from lograptor.logparsers import LogParser, ParserRFC3164, ParserRFC5424, CycleParsers
+
+RFC3164_LINE = 'Jan 31 09:50:03 raptor postfix/smtp[14010]: ED36AD08054: status=sent'
+RFC5424_LINE = '2015-01-31T09:50:03Z raptor postfix - - status=sent'
+
+
+class TestCycleParsers(object):
+
+    def setup_method(self, method):
+        print("\n%s:%s" % (type(self).__name__, method.__name__))
+
+    def test_combine_parsers(self):
+        detector = CycleParsers.combine_parsers([ParserRFC3164(), ParserRFC5424()])
+        assert isinstance(detector, type(re.compile('')))
+        assert detector.groupindex == {}
+        assert CycleParsers.combine_parsers([ParserRFC3164()]) is None
+
+        # A parser with a reference to a group is not combinable
+        parser = ParserRFC3164(ParserRFC3164.PATTERN.replace(
+            r'(?P<day>(?:[1-3]| )[0-9]) ', r'(?P<day>(?:[1-3]| )[0-9]) (?:(?P=day) )?'
+        ))
+        assert CycleParsers.combine_parsers([parser, ParserRFC5424()]) is None
+
+        # A parser that overrides the match method is not combinable
+        class CustomParser(ParserRFC3164):
+            def match(self, line):
+                return LogParser.match(self, line.lstrip())
+
+        assert CycleParsers.combine_parsers([CustomParser(), ParserRFC5424()]) is None
+
+    def test_detect(self):
+        cycle_parsers = CycleParsers([ParserRFC3164(), ParserRFC5424()])
+        assert cycle_parsers.detector is not None
+        parser, match = cycle_parsers.detect(RFC5424_LINE)
+        assert isinstance(parser, ParserRFC5424)
+        assert match.group('host') == 'raptor'
+        assert cycle_parsers.detect('unparsable line') == (None, None)
+
+        # Without a detector the parsers are tried in turn
+        parser = ParserRFC3164(ParserRFC3164.PATTERN.replace(
+            r'(?P<day>(?:[1-3]| )[0-9]) ', r'(?P<day>(?:[1-3]| )[0-9]) (?:(?P=day) )?'
+        ))
+        cycle_parsers = CycleParsers([parser, ParserRFC5424()])
+        assert cycle_parsers.detector is None
+        assert cycle_parsers.detect(RFC3164_LINE)[0] is parser
+        assert isinstance(cycle_parsers.detect(RFC5424_LINE)[0], ParserRFC5424)
+        assert cycle_parsers.detect('unparsable line') == (None, None)
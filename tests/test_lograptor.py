@@ -114,6 +114,45 @@ class TestLograptor(object):
                 print(u"\n{0}".format(out))
                 assert False
 
+    def test_only_matching(self, capsys):
+        tests = [
+            ("-o -e tric -e triceratops samples/postfix.log",
+             r'postfix\.log\n(triceratops\n){4}\n--- lograptor run summary', 0),
+            ("-o -e triceratops -e tric samples/postfix.log",
+             r'postfix\.log\n(triceratops\n){4}\n--- lograptor run summary', 0),
+        ]
+        for cmd_line, result, retval in tests:
+            assert retval == self.exec_lograptor(cmd_line)
+            out, err = capsys.readouterr()
+            if re.search(result, out) is None:
+                print(u"\n{0}".format(out))
+                assert False
+
+    def test_joined_patterns(self):
+        args = self.cli_parser.parse_args(args=[
+            '-e', 'tric', '-e', 'triceratops', '-e', 't(?P<x>r)ex', '-e', '(?P<t>t)(?P=t)',
+            'samples/postfix.log'
+        ])
+        args.cfgfiles = CONFIG_FILES
+        patterns = lograptor.LogRaptor(args).patterns
+        assert [pat.pattern for pat in patterns] == [
+            '((?P<t>t)(?P=t))', '(t(?P<x>r)ex)', '((?:(?:triceratops)|(?:tric)))'
+        ]
+
+    def test_colored_output(self, capsys):
+        tests = [
+            ("--color=always -n -e tric(e) -e tarbo samples/postfix.log",
+             r'\x1b\[1m\x1b\[31mtarbo\x1b\[0msaurus', 0),
+            ("--color=always -n -e tric -e tarbo samples/postfix.log",
+             r'\x1b\[1m\x1b\[31mtric\x1b\[0meratops', 0),
+        ]
+        for cmd_line, result, retval in tests:
+            assert retval == self.exec_lograptor(cmd_line)
+            out, err = capsys.readouterr()
+            if re.search(result, out) is None:
+                print(u"\n{0}".format(out))
+                assert False
+
     def test_patfile(self, capsys):
         tests = [
             ("-a postfix -c -s -f ./samples/patterns.txt '' samples/postfix.log",
@@ -0,0 +1,47 @@
+#
+# Copyright (C), 2011-2020, by SISSA - International School for Advanced Studies.
+#
+# This file is part of lograptor.
+#
+# Lograptor is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This software is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# file 'LICENSE' in the root directory of the present distribution
+# for more details.
+#
+# @Author Davide Brunato <brunato@sissa.it>
+#
+from lograptor.matcher import AppTagsMap
+
+
+class TestAppTagsMap(object):
+
+    def setup_method(self, method):
+        print("\n%s:%s" % (type(self).__name__, method.__name__))
+
+    def test_prefix_tags(self):
+        tags = AppTagsMap({'postfix': ['postfix'], 'post': ['other'], 'sshd': ['sshd']})
+        assert tags['sshd'] == ['sshd']
+        assert tags['postfix/smtpd'] == ['postfix', 'other']
+        assert tags['postfix/smtpd'] is tags['postfix/smtpd']
+        assert 'postfix/smtpd' in tags
+
+    def test_unknown_tags(self):
+        tags = AppTagsMap({'sshd': ['sshd']})
+        assert tags['dovecot'] == []
+        assert tags['dovecot'] is tags['dovecot']
+        assert dict(tags) == {'sshd': ['sshd'], 'dovecot': []}
+
+    def test_cache_reset(self):
+        tags = AppTagsMap({'sshd': ['sshd']})
+        for k in range(4096):
+            assert tags['sshd-%d' % k] == ['sshd']
+        assert len(tags) == 4097
+
+        assert tags['dovecot'] == []
+        assert dict(tags) == {'sshd': ['sshd'], 'dovecot': []}
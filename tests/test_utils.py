@@ -17,6 +17,7 @@
 # @Author Davide Brunato <brunato@sissa.it>
 #
 import io
+import re
 import pytest
 import sys
 import os
@@ -25,7 +26,8 @@ import tempfile
 
 from lograptor.utils import do_chunked_gzip, get_value_unit, get_fmt_results, \
     htmlsafe, safe_expand, results_to_string, protected_property, normalize_path, \
-    open_resource, is_redirected
+    open_resource, is_redirected, get_leading_literal, get_required_literals, \
+    get_pattern_literals, tuple_itemgetter, is_combinable, is_embeddable, unname_groups
 
 
 class TestUtils(object):
@@ -181,6 +183,55 @@ class TestUtils(object):
         with pytest.raises(TypeError):
             open_resource(["samples/postfix.log"])
 
+    def test_get_leading_literal(self):
+        assert get_leading_literal(r'Accepted (?P<method>\S+)') == 'A'
+        assert get_leading_literal(r'(?:[s])tatus=(?P<status>\w+)') == 's'
+        assert get_leading_literal(r'(?P<status>s)tatus=\w+') is None
+        assert get_leading_literal(r'\w+=(?P<value>\d+)') is None
+        assert get_leading_literal(r'(unbalanced') is None
+
+    def test_get_required_literals(self):
+        assert get_required_literals(r'Accepted (?P<method>\S+) for (?P<user>\S+)') == \
+            ['Accepted ', ' for ']
+        assert get_required_literals(r'(?P<id>\w+): from=<(?P<from>[^>]*)>') == [': from=<', '>']
+        assert get_required_literals(r'for (?P<user>tric.*) from') == ['for tric', ' from']
+        assert get_required_literals(r'(?i)Accepted (?P<method>\S+)') == []
+        assert get_required_literals(r'(Accepted)', re.IGNORECASE) == []
+        assert get_required_literals(r'Accepted password', re.VERBOSE) == ['Acceptedpassword']
+        assert get_required_literals(r'Accepted (?i:password)') == ['Accepted ']
+        assert get_required_literals(r'(foo|bar)') == []
+        assert get_required_literals(r'(unbalanced') == []
+
+    def test_get_pattern_literals(self):
+        assert get_pattern_literals(r'Accepted (?:.) for (?:.)') == ('A', ['Accepted ', ' for '])
+        assert get_pattern_literals(r'(?i)Accepted (?P<method>\S+)') == ('A', [])
+        assert get_pattern_literals(r'(?P<id>\w+): from=<') == (None, [': from=<'])
+        assert get_pattern_literals(r'(unbalanced') == (None, [])
+
+    def test_is_combinable(self):
+        assert is_combinable(r'(?P<user>\w+) logged in')
+        assert not is_combinable(r'(\w+)=\1')
+        assert not is_combinable(r'(?P<key>\w+)=(?P=key)')
+        assert not is_combinable(r'(<)?\w+(?(1)>)')
+        assert not is_combinable(r'(?i)logged in')
+
+    def test_is_embeddable(self):
+        assert is_embeddable(r'(|[A-Za-z0-9{|}~-]+)')
+        assert is_embeddable(r'[]|]\|(?i:root)')
+        assert not is_embeddable(r'root|admin')
+        assert not is_embeddable(r'(?i)[a-z]+')
+        assert not is_embeddable(r'a)(b')
+        assert not is_embeddable(r'(a')
+
+    def test_unname_groups(self):
+        assert unname_groups(r'(?P<user>\w+) from (?P<host>\S+)') == r'(\w+) from (\S+)'
+        assert unname_groups(r'\(?P<user>\w+)') == r'\(?P<user>\w+)'
+
+    def test_tuple_itemgetter(self):
+        assert tuple_itemgetter([2, 0])('abc') == ('c', 'a')
+        assert tuple_itemgetter(['host'])({'host': 'alpha'}) == ('alpha',)
+        assert tuple_itemgetter([])('abc') == ()
+
     def test_is_redirected(self):
         try:
             STDIN_FILENO = sys.stdin.fileno()